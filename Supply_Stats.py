@@ -1,180 +1,137 @@
-from datetime import datetime, timedelta
-
-import pandas as pd
-import plotly.express as px
-import requests
 import streamlit as st
 
+import aggregates
+import chains
+import figures
+import frames
+import metrics
+import refresher
+import rollups
+import shared_cache
+import snapshot_store
+
 st.set_page_config(page_title='Aave Dashboard', layout='wide', page_icon=':dollar:')
 st.title("Aave v2 and v3 Dashboard - Supply/TVL")
 st.sidebar.title('Supply/TVL')
 st.sidebar.markdown("this page Contains the Aave version 2 and 3 Supply/TVL for all chains supported by Aave 🎈")
 
+ALL_CHAINS = 'All chains'
+
+refresher.start()
+metrics.serve_from_env()
+metrics.show_debug_panel()
+
+
+@shared_cache.cached(ttl=24 * 60 * 60)
+def load_data(url: str, version: int):
+    with metrics.timed('load', source=chains.source_name(url)):
+        return frames.stored_snapshot_frame(url, version)
+
+
+@shared_cache.cached(ttl=24 * 60 * 60)
+def load_aggregates(url: str, version: int):
+    chart_data = load_data(url, version)
+    with metrics.timed('aggregate', source=chains.source_name(url)):
+        return aggregates.supply_aggregates(chart_data)
+
+
+def fetch_aggregates(url: str):
+    """Aggregates of the subgraph with the store version they were computed from."""
+    # snapshots are fetched by the refresher, pages only read the store;
+    # a subgraph is fetched here only once, when it has never been stored before
+    if not snapshot_store.version(url):
+        refresher.refresh_subgraph(url)
+    version = snapshot_store.version(url)
+    return load_aggregates(url, version), version
+
+
+@shared_cache.cached(ttl=24 * 60 * 60)
+def load_chain_totals(url: str, version: int):
+    return aggregates.chain_totals(load_aggregates(url, version))
 
-@st.cache(ttl=6 * 60 * 60)  # 6 hours
-def fetch_data(url: str):
-    first = 1000
-    block_number = 0
-    raw_data = []
-    while True:
-        payload = {
-            "query": "query{ marketDailySnapshots(first:%s, orderBy: blockNumber, orderDirection: asc, where:{blockNumber_gt: %d}){ dailyBorrowUSD dailyLiquidateUSD dailyRepayUSD blockNumber timestamp totalValueLockedUSD dailyDepositUSD dailyWithdrawUSD market { id name } } } " % (
-                first, block_number),
-        }
-        res = requests.post(url=url,
-                            json=payload).json()
-
-        if not res['data']['marketDailySnapshots']:
-            break
-        raw_data.extend(res['data']['marketDailySnapshots'])
-        block_number = max([int(b['blockNumber']) for b in raw_data])
-
-    for item in raw_data:
-        item['Day'] = datetime.fromtimestamp(int(item['timestamp'])).date()
-        item['Asset'] = item['market']['name']
-        item['TVL'] = int(float(item['totalValueLockedUSD']))
-        item['dailyDepositUSD'] = int(float(item['dailyDepositUSD']))
-        item['dailyWithdrawUSD'] = int(float(item['dailyWithdrawUSD']))
-
-        item['dailyBorrowUSD'] = int(float(item['dailyBorrowUSD']))
-        item['dailyLiquidateUSD'] = int(float(item['dailyLiquidateUSD']))
-        item['dailyRepayUSD'] = int(float(item['dailyRepayUSD']))
-    # st.json(raw_data)
-    return pd.DataFrame(
-        raw_data,
-        columns=["Day", "TVL", 'dailyDepositUSD', 'dailyWithdrawUSD', "Asset", "dailyBorrowUSD", "dailyLiquidateUSD", "dailyRepayUSD"])
-
-
-def get_change(current, previous):
-    if current == previous:
-        return 0
-    try:
-        return (abs(current - previous) / previous) * 100.0
-    except ZeroDivisionError:
-        return float('inf')
+
+@shared_cache.cached(ttl=24 * 60 * 60)
+def load_all_chains(versions: tuple):
+    # keyed by every chain's data version: a refresh of one chain only recomputes that chain's totals
+    return aggregates.combine_chains({label: load_chain_totals(chains.CHAINS_BY_LABEL[label].subgraph, version)
+                                      for label, version in versions})
+
+
+def fetch_all_chains():
+    """
+    Merges whatever per-chain data is already stored, returning it with the (label, version) pairs it was
+    built from; chains never fetched yet are left out and returned as missing.
+    """
+    versions = tuple((chain.label, snapshot_store.version(chain.subgraph)) for chain in chains.CHAINS)
+    loaded = tuple((label, version) for label, version in versions if version)
+    missing = [label for label, version in versions if not version]
+    return (load_all_chains(loaded) if loaded else None), loaded, missing
 
 
 def get_delta_color(from_num, to_num):
     return 'inverse' if from_num > to_num else 'normal'
 
 
-def generate_supply_charts(chart_data):
-    today_tvls = chart_data.sort_values("Day", ascending=False).groupby("Asset").head(1)
-    one_month_ago_tvls = chart_data.loc[chart_data['Day'] == datetime.now().date() - timedelta(days=30)]
-    one_month_ago_tvl = one_month_ago_tvls['TVL'].sum()
-    today_tvl = today_tvls['TVL'].sum()
+def show_chart(container, supply: aggregates.SupplyAggregates, data_key: tuple, chart_id: str,
+               resolution: str = 'auto'):
+    fig = figures.shared_supply_figure(supply, data_key, chart_id, resolution)
+    # plotly_chart serializes the figure
+    with metrics.timed('render', chart=chart_id):
+        container.plotly_chart(fig, use_container_width=True)
 
+
+def generate_supply_charts(supply: aggregates.SupplyAggregates, data_key: tuple, resolution: str = 'auto'):
     # Metrics
     c1, c2, c3, c4 = st.columns(4, gap="small")
-    c2.metric("Current USD TVL", "${:,}".format(today_tvl))
-    c3.metric("USD TVL Changes(1 month)", "${:,}".format(today_tvl - one_month_ago_tvl),
-              f"{round(get_change(today_tvl, one_month_ago_tvl), 2)}%",
-              delta_color=get_delta_color(one_month_ago_tvl, today_tvl))
+    c1.metric("Net Flow(1 month)", "${:,}".format(int(supply.trends['net_flow'].sum(30))),
+              help='Deposited minus withdrawn USD in the last 30 days')
+    c2.metric("Current USD TVL", "${:,}".format(supply.today_tvl))
+    c3.metric("USD TVL Changes(1 month)", "${:,}".format(supply.tvl_delta),
+              f"{round(supply.tvl_change, 2)}%",
+              delta_color=get_delta_color(supply.month_ago_tvl, supply.today_tvl))
+    c4.metric("Utilization(1 month)", f"{round(aggregates.utilization(supply.trends, 30), 2)}%",
+              help='Borrowed over deposited USD in the last 30 days')
     st.markdown("""---""")
 
     # end metrics
 
     col1, col2 = st.columns(2, gap="small")
-
-    fig = px.pie(today_tvls, values='TVL', names='Asset',
-                 title='TVL Distribution', template='seaborn')
-    fig.update_traces(textposition='inside', textinfo='value+label', insidetextorientation='radial')
-    fig.update_layout(title_x=0, margin=dict(l=0, r=10, b=30, t=30), yaxis_title=None, xaxis_title=None)
-    col1.plotly_chart(fig, use_container_width=True)
-
-    fig = px.pie(one_month_ago_tvls, values='TVL', names='Asset', title='One Month ago TVL Distribution',
-                 template='seaborn')
-    fig.update_traces(textposition='inside', textinfo='value+label', insidetextorientation='radial')
-    fig.update_layout(title_x=0, margin=dict(l=0, r=10, b=30, t=30), yaxis_title=None, xaxis_title=None)
-    col2.plotly_chart(fig, use_container_width=True)
+    show_chart(col1, supply, data_key, 'tvl_distribution')
+    show_chart(col2, supply, data_key, 'month_ago_tvl_distribution')
 
     st.markdown("""---""")
 
-    fig = px.area(chart_data, x='Day', y='TVL', color='Asset', title="TVL/Supply Locked over time",
-                  template='seaborn')
-    fig.update_traces(mode="lines", hovertemplate=None)
-    fig.update_layout(hovermode="x unified")
-    fig.update_layout(title_x=0, margin=dict(l=0, r=10, b=30, t=30), yaxis_title=None, xaxis_title=None)
-    st.plotly_chart(fig, use_container_width=True)
+    show_chart(st, supply, data_key, 'tvl_over_time', resolution)
 
     col1, col2 = st.columns(2)
+    show_chart(col1, supply, data_key, 'deposits', resolution)
+    show_chart(col2, supply, data_key, 'withdraws', resolution)
 
-    fig = px.bar(chart_data, x='Day', y='dailyDepositUSD', color='Asset', title="Daily Deposit in USD",
-                 template='seaborn')
-    fig.update_traces(hovertemplate=None)
-    fig.update_layout(hovermode="x unified")
-    fig.update_layout(title_x=0, margin=dict(l=0, r=10, b=30, t=30), yaxis_title=None, xaxis_title=None)
-
-    col1.plotly_chart(fig, use_container_width=True)
-
-    fig = px.bar(chart_data, x='Day', y='dailyWithdrawUSD', color='Asset', title="Daily Withdraw in USD",
-                 template='seaborn')
-    fig.update_traces(hovertemplate=None)
-    fig.update_layout(hovermode="x unified")
-    fig.update_layout(title_x=0, margin=dict(l=0, r=10, b=30, t=30), yaxis_title=None, xaxis_title=None)
-    col2.plotly_chart(fig, use_container_width=True)
-
+    for chart_id in ('borrows', 'liquidations', 'repays'):
+        show_chart(st, supply, data_key, chart_id, resolution)
 
+    st.markdown("""---""")
 
-    fig = px.bar(chart_data, x='Day', y='dailyBorrowUSD', color='Asset', title="Daily Borrow in USD",
-                  template='seaborn')
-    fig.update_traces(hovertemplate=None)
-    fig.update_layout(hovermode="x")
-    fig.update_layout(title_x=0, margin=dict(l=0, r=10, b=30, t=30), yaxis_title=None, xaxis_title=None)
-    st.plotly_chart(fig, use_container_width=True)
+    col1, col2 = st.columns(2)
+    show_chart(col1, supply, data_key, 'net_flow_trend', resolution)
+    show_chart(col2, supply, data_key, 'utilization_trend', resolution)
 
-    fig = px.bar(chart_data, x='Day', y='dailyLiquidateUSD', color='Asset', title="Daily Liquidate in USD",
-                  template='seaborn')
-    fig.update_traces(hovertemplate=None)
-    fig.update_layout(hovermode="x")
-    fig.update_layout(title_x=0, margin=dict(l=0, r=10, b=30, t=30), yaxis_title=None, xaxis_title=None)
-    st.plotly_chart(fig, use_container_width=True)
 
-    fig = px.bar(chart_data, x='Day', y='dailyRepayUSD', color='Asset', title="Daily Repay in USD",
-                  template='seaborn')
-    fig.update_traces(hovertemplate=None)
-    fig.update_layout(hovermode="x")
-    fig.update_layout(title_x=0, margin=dict(l=0, r=10, b=30, t=30), yaxis_title=None, xaxis_title=None)
-    st.plotly_chart(fig, use_container_width=True)
+resolution = st.sidebar.selectbox('Chart resolution', rollups.RESOLUTIONS,
+                                  help='auto picks the finest bucket that keeps every chart light to render')
 
 with st.spinner('Updating Report...'):
-    activation_function = st.selectbox('Choose a Chain',
-                                       ['Avalanche v2', 'Avalanche v3', 'Ethereum', 'Optimism', 'Fantom', 'Arbitrum',
-                                        'Harmony', 'Polygon v2', 'Polygon v3'])
-
-    if activation_function == 'Avalanche v2':
-        chart_data = fetch_data('https://api.thegraph.com/subgraphs/name/messari/aave-v2-avalanche-extended')
-        generate_supply_charts(chart_data)
-
-    if activation_function == 'Avalanche v3':
-        chart_data = fetch_data('https://api.thegraph.com/subgraphs/name/messari/aave-v3-avalanche')
-        generate_supply_charts(chart_data)
-
-    if activation_function == 'Ethereum':
-        chart_data = fetch_data('https://api.thegraph.com/subgraphs/name/messari/aave-v2-ethereum-extended')
-        generate_supply_charts(chart_data)
-
-    if activation_function == 'Optimism':
-        chart_data = fetch_data('https://api.thegraph.com/subgraphs/name/messari/aave-v3-optimism-extended')
-        generate_supply_charts(chart_data)
-
-    if activation_function == 'Polygon v3':
-        chart_data = fetch_data('https://api.thegraph.com/subgraphs/name/messari/aave-v3-polygon-extended')
-        generate_supply_charts(chart_data)
-
-    if activation_function == 'Polygon v2':
-        st.warning('The database is in the process of updating and has not been fully backfilled')
-        chart_data = fetch_data('https://api.thegraph.com/subgraphs/name/messari/aave-v2-polygon-extended')
-        generate_supply_charts(chart_data)
-
-    if activation_function == 'Harmony':
-        chart_data = fetch_data('https://api.thegraph.com/subgraphs/name/messari/aave-v3-harmony-extended')
-        generate_supply_charts(chart_data)
-
-    if activation_function == 'Fantom':
-        chart_data = fetch_data('https://api.thegraph.com/subgraphs/name/messari/aave-v3-fantom-extended')
-        generate_supply_charts(chart_data)
-
-    if activation_function == 'Arbitrum':
-        chart_data = fetch_data('https://api.thegraph.com/subgraphs/name/messari/aave-v3-arbitrum-extended')
-        generate_supply_charts(chart_data)
+    activation_function = st.selectbox('Choose a Chain', [chain.label for chain in chains.CHAINS] + [ALL_CHAINS])
+
+    if activation_function == ALL_CHAINS:
+        supply, loaded, missing = fetch_all_chains()
+        if missing:
+            st.info('Still loading, not included yet: ' + ', '.join(missing))
+        if supply is not None:
+            generate_supply_charts(supply, (ALL_CHAINS, loaded), resolution)
+    else:
+        chain = chains.CHAINS_BY_LABEL[activation_function]
+        if not chain.backfilled:
+            st.warning('The database is in the process of updating and has not been fully backfilled')
+        supply, version = fetch_aggregates(chain.subgraph)
+        generate_supply_charts(supply, (chain.label, version), resolution)
@@ -0,0 +1,119 @@
+from collections import namedtuple
+
+import pandas as pd
+
+import analytics
+
+SUPPLY_METRICS = ('TVL', 'dailyDepositUSD', 'dailyWithdrawUSD', 'dailyBorrowUSD', 'dailyLiquidateUSD', 'dailyRepayUSD')
+
+SupplyAggregates = namedtuple('SupplyAggregates', ['latest_tvls', 'month_ago_tvls', 'today_tvl', 'month_ago_tvl',
+                                                   'tvl_delta', 'tvl_change', 'pivots', 'trends'])
+
+
+def get_change(current, previous):
+    if current == previous:
+        return 0
+    try:
+        return (abs(current - previous) / previous) * 100.0
+    except ZeroDivisionError:
+        return float('inf')
+
+
+def supply_trends(pivots: dict):
+    """Daily series the trend charts and cards read: net flow (deposits - withdraws), deposits and borrows."""
+    deposits, borrows = pivots['dailyDepositUSD'].sum(axis=1), pivots['dailyBorrowUSD'].sum(axis=1)
+    return {'net_flow': analytics.DailySeries(deposits - pivots['dailyWithdrawUSD'].sum(axis=1)),
+            'deposits': analytics.DailySeries(deposits),
+            'borrows': analytics.DailySeries(borrows)}
+
+
+def staking_trends(chart_data: pd.DataFrame):
+    """Staked USD and AAVE (cumulative) and the daily net stake in USD, one value per day."""
+    daily = chart_data.groupby('Day')
+    return {'staked_usd': analytics.DailySeries(daily['STAKED_CUMU'].last()),
+            'staked_aave': analytics.DailySeries(daily['AAVE_STAKED_CUMU'].last()),
+            'net_stake_usd': analytics.DailySeries(daily['TOTAL_STAKED_USD'].sum())}
+
+
+def utilization(trends: dict, days: int):
+    """Borrows over deposits of the last ``days`` days, in percent."""
+    deposits = trends['deposits'].sum(days)
+    return trends['borrows'].sum(days) / deposits * 100.0 if deposits else 0.0
+
+
+def supply_aggregates(chart_data: pd.DataFrame):
+    """
+    Everything ``generate_supply_charts`` reads, computed in one pass per data refresh:
+    the latest and 30-day-old TVL per asset, the 30-day TVL delta, a Day x Asset table per metric
+    and the trend series.
+
+    The month-ago TVL of an asset is its last snapshot on or before 30 days before the latest day,
+    so a day missing from the history does not turn it into 0.
+    """
+    latest_rows = chart_data.sort_values('Day').groupby('Asset', observed=True).tail(1)
+    latest_tvls = latest_rows.groupby('Asset', observed=True)['TVL'].sum()
+
+    month_ago_rows = chart_data.iloc[:0]
+    if len(chart_data):
+        # a history shorter than a month compares with its first day
+        month_ago = max(chart_data['Day'].max() - pd.Timedelta(days=30), chart_data['Day'].min())
+        month_ago_rows = chart_data.loc[chart_data['Day'] <= month_ago].sort_values('Day')
+        month_ago_rows = month_ago_rows.groupby('Asset', observed=True).tail(1)
+    month_ago_tvls = month_ago_rows.groupby('Asset', observed=True)['TVL'].sum()
+
+    pivots = {}
+    for metric in SUPPLY_METRICS:
+        if metric == 'TVL':
+            # snapshots are only written on days with activity: a balance carries over the days without one
+            pivot = chart_data.pivot_table(index='Day', columns='Asset', values=metric, aggfunc='sum', observed=True)
+            pivot = pivot.ffill().fillna(0).astype('int64')
+        else:
+            pivot = chart_data.pivot_table(index='Day', columns='Asset', values=metric, aggfunc='sum', fill_value=0,
+                                           observed=True)
+        pivot.columns = pivot.columns.astype(str)
+        pivot.columns.name = 'Asset'
+        pivots[metric] = pivot
+
+    today_tvl, month_ago_tvl = int(latest_tvls.sum()), int(month_ago_tvls.sum())
+    return SupplyAggregates(latest_tvls=latest_tvls, month_ago_tvls=month_ago_tvls, today_tvl=today_tvl,
+                            month_ago_tvl=month_ago_tvl, tvl_delta=today_tvl - month_ago_tvl,
+                            tvl_change=get_change(today_tvl, month_ago_tvl), pivots=pivots,
+                            trends=supply_trends(pivots))
+
+
+ChainTotals = namedtuple('ChainTotals', ['today_tvl', 'month_ago_tvl', 'daily'])
+
+
+def chain_totals(supply: SupplyAggregates):
+    """One chain summed over its assets: the only part of it the all-chains view needs."""
+    # the TVL pivot carries every asset's balance over its days without a snapshot, so the chain's
+    # daily TVL does not drop when only some of its assets have one
+    daily = pd.DataFrame({metric: pivot.sum(axis=1) for metric, pivot in supply.pivots.items()})
+    return ChainTotals(today_tvl=supply.today_tvl, month_ago_tvl=supply.month_ago_tvl, daily=daily)
+
+
+def combine_chains(totals: dict):
+    """
+    Merges per-chain totals, keyed by chain label, into aggregates shaped like a single chain's,
+    with one series per chain instead of per asset.
+    """
+    latest_tvls = pd.Series({label: chain.today_tvl for label, chain in totals.items()}, dtype='int64')
+    month_ago_tvls = pd.Series({label: chain.month_ago_tvl for label, chain in totals.items()}, dtype='int64')
+    latest_tvls.index.name = month_ago_tvls.index.name = 'Chain'
+
+    pivots = {}
+    for metric in SUPPLY_METRICS:
+        pivot = pd.DataFrame({label: chain.daily[metric] for label, chain in totals.items()}).sort_index()
+        # a chain without any snapshot on some day keeps its last TVL, it did not drop to zero
+        if metric == 'TVL':
+            pivot = pivot.ffill()
+        pivot = pivot.fillna(0).astype('int64')
+        pivot.index.name = 'Day'
+        pivot.columns.name = 'Chain'
+        pivots[metric] = pivot
+
+    today_tvl, month_ago_tvl = int(latest_tvls.sum()), int(month_ago_tvls.sum())
+    return SupplyAggregates(latest_tvls=latest_tvls, month_ago_tvls=month_ago_tvls, today_tvl=today_tvl,
+                            month_ago_tvl=month_ago_tvl, tvl_delta=today_tvl - month_ago_tvl,
+                            tvl_change=get_change(today_tvl, month_ago_tvl), pivots=pivots,
+                            trends=supply_trends(pivots))
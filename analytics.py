@@ -0,0 +1,90 @@
+"""
+Rolling-window trends over daily series: trailing 7/30/90-day sums, lookups of the nearest available
+earlier day and moving averages.
+
+A ``DailySeries`` lays its values out on a dense daily grid with running sums, so a window sum or an
+as-of lookup is a couple of array reads however long the history is. Days without a value count as
+zero in sums and take the last earlier value in lookups. Series are built once per store version, in
+one vectorized pass over its frame, and shared read-only by every session.
+"""
+import numpy as np
+import pandas as pd
+
+WINDOWS = (7, 30, 90)
+EPOCH = pd.Timestamp('1970-01-01')
+
+
+def _day_number(day):
+    return (pd.Timestamp(day).normalize() - EPOCH).days
+
+
+class DailySeries:
+    def __init__(self, daily: pd.Series):
+        """``daily`` holds values indexed by day; the days it does not have are gaps."""
+        daily = daily.dropna().sort_index()
+        numbers = (pd.DatetimeIndex(daily.index).normalize() - EPOCH).days.to_numpy()
+        self._first = int(numbers[0]) if len(numbers) else 0
+        self._size = int(numbers[-1]) - self._first + 1 if len(numbers) else 0
+        positions = numbers - self._first
+        self._values = np.full(self._size, np.nan)  # NaN on days without a value
+        self._values[positions] = daily.to_numpy(dtype='float64')
+        # sum of every value up to and including the day
+        self._cumsum = np.cumsum(np.nan_to_num(self._values))
+        # position of the last day with a value, up to the day
+        self._asof = np.zeros(self._size, dtype='int64')
+        self._asof[positions] = positions
+        self._asof = np.maximum.accumulate(self._asof)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def first_day(self):
+        return EPOCH + pd.Timedelta(days=self._first) if self._size else None
+
+    @property
+    def last_day(self):
+        return EPOCH + pd.Timedelta(days=self._first + self._size - 1) if self._size else None
+
+    @property
+    def latest(self):
+        return self._values[-1] if self._size else 0
+
+    def _position(self, day):
+        return _day_number(day) - self._first
+
+    def at(self, day):
+        """Value of the nearest day with a value on or before ``day``, or of the first day before the series starts."""
+        if not self._size:
+            return 0
+        position = min(max(self._position(day), 0), self._size - 1)
+        return self._values[self._asof[position]]
+
+    def ago(self, days: int):
+        return self.at(self.last_day - pd.Timedelta(days=days)) if self._size else 0
+
+    def sum(self, days: int):
+        """Sum of the last ``days`` days."""
+        if not self._size:
+            return 0
+        start = self._size - 1 - days
+        return self._cumsum[-1] - (self._cumsum[start] if start >= 0 else 0)
+
+    def _index(self):
+        if not self._size:
+            return pd.DatetimeIndex([], name='Day')
+        return pd.date_range(self.first_day, periods=self._size, freq='D', name='Day')
+
+    def series(self):
+        """Every day of the series, NaN where there is no value."""
+        return pd.Series(self._values.copy(), index=self._index())
+
+    def rolling_sum(self, days: int):
+        """Trailing ``days``-day sum for every day of the series."""
+        shifted = np.zeros(self._size)
+        if days < self._size:
+            shifted[days:] = self._cumsum[:-days]
+        return pd.Series(self._cumsum - shifted, index=self._index())
+
+    def moving_average(self, days: int):
+        return self.rolling_sum(days) / days
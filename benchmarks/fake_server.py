@@ -0,0 +1,125 @@
+"""
+Local stand-in for the Messari subgraphs and the Flipside staking query, serving deterministic
+synthetic histories so benchmarks never touch the network:
+
+    POST /subgraphs/name/bench/<rows>            marketDailySnapshots, paginated like the Graph (first, id_gt),
+                                                 or the latest one (orderBy: blockNumber, orderDirection: desc)
+    GET  /api/v2/queries/bench-<days>/data/latest  Flipside staking rows
+"""
+import json
+import re
+import sys
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BLOCKS_PER_DAY = 6500
+USD_FIELDS = ('totalValueLockedUSD', 'dailyDepositUSD', 'dailyWithdrawUSD', 'dailyBorrowUSD', 'dailyLiquidateUSD',
+              'dailyRepayUSD')
+
+
+def history_shape(rows: int):
+    """(assets, days) of a synthetic history of ``rows`` snapshots: about 2000 days once histories get long."""
+    assets = max(10, rows // 2000)
+    return assets, rows // assets
+
+
+def first_timestamp(days: int):
+    # histories end today, so "last N days" windows always select the same number of rows
+    return int(time.time()) // 86400 * 86400 - (days - 1) * 86400
+
+
+def snapshot(asset: int, day: int, base_timestamp: int):
+    value = (asset * 7919 + day * 104729) % 1000003
+    row = {'id': 'm%04d-%06d' % (asset, day), 'blockNumber': str(day * BLOCKS_PER_DAY + asset),
+           'timestamp': str(base_timestamp + day * 86400 + 3600),
+           'market': {'id': 'm%04d' % asset, 'name': 'Asset %d' % asset}}
+    for i, field in enumerate(USD_FIELDS):
+        row[field] = '%d.%06d' % (value * (i + 1), value)
+    return row
+
+
+def snapshot_page(rows: int, first: int, id_gt: str, block_gte: int = 0, timestamp_gte: int = 0):
+    # ids sort by (asset, day), so the cursor maps straight back to a position in the history
+    assets, days = history_shape(rows)
+    base_timestamp = first_timestamp(days)
+    first_day = max(0, (timestamp_gte - base_timestamp - 3600 + 86399) // 86400)
+    if id_gt:
+        asset, day = (int(part[1:]) if part.startswith('m') else int(part) for part in id_gt.split('-'))
+        asset, day = (asset, day + 1) if day + 1 < days else (asset + 1, 0)
+    else:
+        asset, day = 0, 0
+    page = []
+    while asset < assets and len(page) < first:
+        day = max(day, first_day, (block_gte - asset + BLOCKS_PER_DAY - 1) // BLOCKS_PER_DAY)
+        if day < days:
+            page.append(snapshot(asset, day, base_timestamp))
+            day += 1
+        if day >= days:
+            asset, day = asset + 1, 0
+    return page
+
+
+def staking_rows(days: int):
+    rows, staked, staked_aave = [], 0, 0
+    for day in range(days):
+        net = ((day * 7919) % 2001 - 1000) * 1000.5
+        staked += net
+        staked_aave += net / 100
+        rows.append({'DATE': (date(2020, 1, 1) + timedelta(days=day)).isoformat(),
+                     'TOTAL_STAKED_USD': net, 'TOTAL_STAKED_AAVE': net / 100, 'STAKED_CUMU': staked,
+                     'AAVE_STAKED_CUMU': staked_aave, 'COLOR': 'stake' if net >= 0 else 'unstake'})
+    return rows
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body):
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        rows = int(self.path.rstrip('/').rsplit('/', 1)[-1])
+        query = json.loads(self.rfile.read(int(self.headers['Content-Length'])))['query']
+        first = int(re.search(r'first: *(\d+)', query).group(1))
+        if re.search(r'orderBy: *blockNumber', query):
+            assets, days = history_shape(rows)
+            # the last asset's last day has the highest block
+            latest = snapshot(assets - 1, days - 1, first_timestamp(days))
+            self._send({'data': {'marketDailySnapshots': [{'blockNumber': latest['blockNumber']}][:first]}})
+            return
+        id_gt = re.search(r'id_gt: *"([^"]*)"', query)
+        block_gte = re.search(r'blockNumber_gte: *"?(\d+)', query)
+        timestamp_gte = re.search(r'timestamp_gte: *"?(\d+)', query)
+        page = snapshot_page(rows, first, id_gt.group(1) if id_gt else '', int(block_gte.group(1)) if block_gte else 0,
+                             int(timestamp_gte.group(1)) if timestamp_gte else 0)
+        # like the Graph, only return the fields the query selects
+        selected = set(re.findall(r'\w+', query[query.index('){') + 2:]))
+        page = [{key: ({k: v for k, v in value.items() if k in selected} if key == 'market' else value)
+                 for key, value in row.items() if key in selected} for row in page]
+        self._send({'data': {'marketDailySnapshots': page}})
+
+    def do_GET(self):
+        days = int(re.search(r'/queries/bench-(\d+)/', self.path).group(1))
+        self._send(staking_rows(days))
+
+
+def serve(port_queue=None, port: int = 0):
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    if port_queue is not None:
+        port_queue.put(server.server_port)
+    else:
+        print('serving on http://127.0.0.1:%d' % server.server_port)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    serve(port=int(sys.argv[1]) if len(sys.argv) > 1 else 0)
@@ -0,0 +1,164 @@
+"""
+Times every stage of the data path against the local fake subgraph/Flipside server and compares
+the results with ``baseline.json``:
+
+    python benchmarks/run.py                       # 10k and 100k rows, fails on regressions
+    python benchmarks/run.py --sizes 10000 100000 1000000
+    python benchmarks/run.py --save-baseline       # record the current numbers as the new baseline
+
+Each stage reports wall time, peak traced memory and, for figures, the serialized payload size.
+Memory is traced with tracemalloc for the whole run, so times are comparable with each other and
+with the baseline, not with a production process. Timings depend on the machine: record the baseline
+on the machine that runs the comparison.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aggregates  # noqa: E402
+import fetcher  # noqa: E402
+import figures  # noqa: E402
+import frames  # noqa: E402
+import metrics  # noqa: E402
+import queries  # noqa: E402
+import refresher  # noqa: E402
+import snapshot_store  # noqa: E402
+from benchmarks import fake_server  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_SIZES = (10000, 100000)
+STAKING_DAYS = 2000
+# slack before a stage counts as a regression: timings are noisy, memory and payload sizes are not
+TOLERANCE = {'seconds': 0.5, 'peak_bytes': 0.2, 'payload_bytes': 0.05, 'response_bytes': 0.05}
+MIN_SECONDS_REGRESSION = 0.05  # stages this much faster than that are all noise
+
+
+def _response_bytes():
+    return sum(value for (name, _), value in metrics._counters.items() if name == 'http_response_bytes_total')
+
+
+class Stage:
+    def __init__(self, results: dict, name: str):
+        self.results, self.name = results, name
+
+    def __enter__(self):
+        tracemalloc.reset_peak()
+        self.base = tracemalloc.get_traced_memory()[0]
+        self.received = _response_bytes()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.started
+        peak = tracemalloc.get_traced_memory()[1] - self.base
+        self.results[self.name] = dict(self.results.get(self.name, {}), seconds=round(seconds, 4), peak_bytes=peak)
+        received = _response_bytes() - self.received
+        if received:
+            self.results[self.name]['response_bytes'] = int(received)
+
+
+def bench_supply(base_url: str, rows: int):
+    results = {}
+    url = '%s/subgraphs/name/bench/%d' % (base_url, rows)
+
+    with Stage(results, 'paginate'):
+        fetched = sum(len(page) for page in queries.snapshot_pages(url))
+    assert fetched == rows - rows % fake_server.history_shape(rows)[0], fetched
+    with Stage(results, 'current_tvl'):
+        queries.current_tvl(url)
+
+    with Stage(results, 'refresh'):
+        refresher.refresh_subgraph(url)
+    with Stage(results, 'mmap_load'):
+        frames.stored_snapshot_frame(url, snapshot_store.version(url))
+    with Stage(results, 'load'):
+        stored = snapshot_store.load(url)
+    with Stage(results, 'frame'):
+        chart_data = frames.snapshot_frame(stored)
+    del stored
+    with Stage(results, 'aggregate'):
+        supply = aggregates.supply_aggregates(chart_data)
+    with Stage(results, 'figures'):
+        built = [figures.supply_figure(supply, chart_id) for chart_id in figures.SUPPLY_CHARTS]
+    with Stage(results, 'serialize'):
+        payload = sum(len(fig.to_json()) for fig in built)
+    results['serialize']['payload_bytes'] = payload
+    return results
+
+
+def bench_staking(base_url: str, days: int):
+    results = {}
+    url = '%s/api/v2/queries/bench-%d/data/latest' % (base_url, days)
+    with Stage(results, 'staking_fetch'):
+        records = fetcher.get_json(url)
+    with Stage(results, 'staking_frame'):
+        frames.staking_frame(records)
+    return results
+
+
+def compare(results: dict, baseline: dict):
+    regressions = []
+    for case, stages in results.items():
+        for stage, stage_metrics in stages.items():
+            for metric, value in stage_metrics.items():
+                expected = baseline.get(case, {}).get(stage, {}).get(metric)
+                if not expected or value <= expected * (1 + TOLERANCE[metric]):
+                    continue
+                if metric != 'seconds' or value - expected > MIN_SECONDS_REGRESSION:
+                    regressions.append('%s %s %s: %s > %s' % (case, stage, metric, value, expected))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the dashboard data path.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='snapshot history sizes (rows)')
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the new baseline')
+    args = parser.parse_args()
+
+    port_queue = multiprocessing.Queue()
+    # the server runs in its own process so encoding responses does not compete for this one's GIL
+    server = multiprocessing.Process(target=fake_server.serve, args=(port_queue,), daemon=True)
+    server.start()
+    base_url = 'http://127.0.0.1:%d' % port_queue.get(timeout=10)
+
+    results = {}
+    tracemalloc.start()
+    with tempfile.TemporaryDirectory() as data_dir:
+        snapshot_store.DATA_DIR = data_dir
+        # untimed warm-up, so the first case does not also pay for imports and plotly template loading
+        bench_supply(base_url, 1000)
+        for rows in args.sizes:
+            results['supply-%d' % rows] = bench_supply(base_url, rows)
+        results['staking-%d' % STAKING_DAYS] = bench_staking(base_url, STAKING_DAYS)
+    tracemalloc.stop()
+    server.terminate()
+
+    for case, stages in results.items():
+        for stage, stage_metrics in stages.items():
+            print('%-14s %-14s %9.3fs %10.1f MiB %s' % (
+                case, stage, stage_metrics['seconds'], stage_metrics['peak_bytes'] / 2 ** 20,
+                ' '.join('%d %s' % (stage_metrics[key], key.replace('_', ' '))
+                         for key in ('response_bytes', 'payload_bytes') if key in stage_metrics)))
+
+    if args.save_baseline:
+        baseline = json.load(open(BASELINE)) if os.path.exists(BASELINE) else {}
+        baseline.update(results)
+        with open(BASELINE, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        return 0
+
+    regressions = compare(results, json.load(open(BASELINE))) if os.path.exists(BASELINE) else []
+    for regression in regressions:
+        print('REGRESSION', regression)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
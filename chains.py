@@ -0,0 +1,33 @@
+"""
+Every Aave market the dashboard shows. Adding a chain only takes a new entry here: the Supply
+selectbox, the Insights TVL grid and the refresher schedule are all built from ``CHAINS``.
+"""
+from collections import namedtuple
+
+SUBGRAPHS = 'https://api.thegraph.com/subgraphs/name/messari/'
+DEFAULT_REFRESH_INTERVAL = 30 * 60  # seconds
+
+Chain = namedtuple('Chain', ['label', 'chain', 'version', 'subgraph', 'backfilled', 'refresh_interval'])
+
+CHAINS = [
+    Chain('Avalanche v2', 'Avalanche', 'v2', SUBGRAPHS + 'aave-v2-avalanche-extended', True, DEFAULT_REFRESH_INTERVAL),
+    Chain('Avalanche v3', 'Avalanche', 'v3', SUBGRAPHS + 'aave-v3-avalanche-extended', True, DEFAULT_REFRESH_INTERVAL),
+    Chain('Ethereum', 'Ethereum', 'v2', SUBGRAPHS + 'aave-v2-ethereum-extended', True, DEFAULT_REFRESH_INTERVAL),
+    Chain('Optimism', 'Optimism', 'v3', SUBGRAPHS + 'aave-v3-optimism-extended', True, DEFAULT_REFRESH_INTERVAL),
+    Chain('Fantom', 'Fantom', 'v3', SUBGRAPHS + 'aave-v3-fantom-extended', True, DEFAULT_REFRESH_INTERVAL),
+    Chain('Arbitrum', 'Arbitrum', 'v3', SUBGRAPHS + 'aave-v3-arbitrum-extended', True, DEFAULT_REFRESH_INTERVAL),
+    Chain('Harmony', 'Harmony', 'v3', SUBGRAPHS + 'aave-v3-harmony-extended', True, DEFAULT_REFRESH_INTERVAL),
+    Chain('Polygon v2', 'Polygon', 'v2', SUBGRAPHS + 'aave-v2-polygon-extended', False, DEFAULT_REFRESH_INTERVAL),
+    Chain('Polygon v3', 'Polygon', 'v3', SUBGRAPHS + 'aave-v3-polygon-extended', True, DEFAULT_REFRESH_INTERVAL),
+]
+CHAINS_BY_LABEL = {chain.label: chain for chain in CHAINS}
+
+STAKING_URL = 'https://node-api.flipsidecrypto.com/api/v2/queries/60316905-bca9-4ebc-8459-ac7a20e8eb5c/data/latest'
+STAKING_REFRESH_INTERVAL = DEFAULT_REFRESH_INTERVAL
+
+
+def source_name(url: str):
+    """Short name of a data source: the subgraph name, or flipside-<query id> for a Flipside query."""
+    if '/queries/' in url:
+        return 'flipside-' + url.split('/queries/', 1)[1].split('/', 1)[0]
+    return url.rstrip('/').rsplit('/', 1)[-1]
@@ -0,0 +1,120 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+except ImportError:  # optional, only makes decoding large responses faster
+    orjson = None
+
+import chains
+import metrics
+
+DEFAULT_TIMEOUT = (5, 60)  # (connect, read) seconds
+MAX_WORKERS = 8
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class SubgraphError(Exception):
+    pass
+
+
+def session():
+    """One keep-alive session shared by every page and worker thread of the process."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS, max_retries=2)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
+
+
+def _decode(res: requests.Response):
+    return orjson.loads(res.content) if orjson is not None else res.json()
+
+
+def _request(method: str, url: str, timeout, **kwargs):
+    source = chains.source_name(url)
+    metrics.inc('http_requests_total', source=source)
+    started = time.perf_counter()
+    try:
+        res = session().request(method, url=url, timeout=timeout, **kwargs)
+        res.raise_for_status()
+    except requests.RequestException:
+        metrics.inc('http_errors_total', source=source)
+        raise
+    finally:
+        metrics.observe('http_request_seconds', time.perf_counter() - started, source=source)
+    metrics.inc('http_response_bytes_total', len(res.content), source=source)
+    return _decode(res)
+
+
+def post_graphql(url: str, query: str, timeout=DEFAULT_TIMEOUT):
+    body = _request('POST', url, timeout, json={"query": query})
+    if body.get('errors'):
+        metrics.inc('http_errors_total', source=chains.source_name(url))
+        raise SubgraphError('%s: %s' % (url, body['errors']))
+    return body['data']
+
+
+def get_json(url: str, timeout=DEFAULT_TIMEOUT):
+    return _request('GET', url, timeout)
+
+
+def fetch_all(func, keys, max_workers: int = MAX_WORKERS):
+    """
+    Calls ``func(key)`` for every key on a bounded thread pool.
+
+    Returns ``(results, errors)``, both dicts keyed by key, so one slow or broken chain
+    does not hide the others: the total time is bounded by the slowest call.
+    """
+    keys = list(keys)
+    results, errors = {}, {}
+    if not keys:
+        return results, errors
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(keys))) as pool:
+        futures = {key: pool.submit(func, key) for key in keys}
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                errors[key] = e
+    return results, errors
+
+
+def _where(conditions: dict):
+    return ', '.join('%s: %s' % (key, json.dumps(value)) for key, value in conditions.items())
+
+
+def paginate(url: str, entity: str, fields: str, where: dict = None, first: int = 1000, timeout=DEFAULT_TIMEOUT):
+    """
+    Yields every ``entity`` row matching ``where`` page by page, ordered by id.
+
+    Pages are keyed on an ``id_gt`` cursor taken from the last row of the previous page, so rows
+    sharing a block number are never lost at a page boundary and no history-wide scan is needed to
+    advance. The next page is requested as soon as a page arrives, while the caller processes it.
+    ``fields`` must select ``id``.
+    """
+    where = dict(where or {})
+
+    def fetch_page(cursor: str):
+        query = "query{ %s(first: %d, orderBy: id, orderDirection: asc, where: {%s}){ %s } }" % (
+            entity, first, _where(dict(where, id_gt=cursor)), fields)
+        return post_graphql(url, query, timeout)[entity]
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        next_page = pool.submit(fetch_page, '')
+        while next_page is not None:
+            page = next_page.result()
+            next_page = pool.submit(fetch_page, page[-1]['id']) if len(page) == first else None
+            metrics.inc('pages_fetched_total', source=chains.source_name(url))
+            if page:
+                yield page
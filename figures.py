@@ -0,0 +1,101 @@
+import pandas as pd
+import plotly.express as px
+
+import aggregates
+import analytics
+import chains
+import metrics
+import rollups
+import shared_cache
+
+# chart id -> (metric, title) of the bar charts of daily flows
+FLOW_CHARTS = {
+    'deposits': ('dailyDepositUSD', "Deposit in USD"),
+    'withdraws': ('dailyWithdrawUSD', "Withdraw in USD"),
+    'borrows': ('dailyBorrowUSD', "Borrow in USD"),
+    'liquidations': ('dailyLiquidateUSD', "Liquidate in USD"),
+    'repays': ('dailyRepayUSD', "Repay in USD"),
+}
+TREND_CHARTS = ('net_flow_trend', 'utilization_trend')
+SUPPLY_CHARTS = ('tvl_distribution', 'month_ago_tvl_distribution', 'tvl_over_time') + tuple(FLOW_CHARTS) + TREND_CHARTS
+FIGURE_TTL = 24 * 60 * 60
+# every chart of every chain (and all chains) at every resolution; figures get their own cache because
+# shared_cache.sizeof cannot weigh them, and they would otherwise evict the frames and aggregates
+MAX_FIGURES = (len(chains.CHAINS) + 1) * len(SUPPLY_CHARTS) * len(rollups.RESOLUTIONS)
+
+figure_cache = shared_cache.BoundedCache(max_entries=MAX_FIGURES)
+
+
+def _tvl_pie(tvls, title: str):
+    fig = px.pie(values=tvls.values, names=tvls.index, title=title, template='seaborn')
+    fig.update_traces(textposition='inside', textinfo='value+label', insidetextorientation='radial')
+    fig.update_layout(title_x=0, margin=dict(l=0, r=10, b=30, t=30), yaxis_title=None, xaxis_title=None)
+    return fig
+
+
+def _windows(series_for_window):
+    table = pd.DataFrame({'%dd' % days: series_for_window(days) for days in analytics.WINDOWS})
+    table.columns.name = 'Window'
+    return table
+
+
+def _trend_figure(supply: aggregates.SupplyAggregates, chart_id: str, resolution: str):
+    trends = supply.trends
+    if chart_id == 'net_flow_trend':
+        table, title = _windows(trends['net_flow'].rolling_sum), "Net Flow (deposits - withdraws) in USD"
+    else:
+        # rolling borrows over rolling deposits, undefined while nothing was deposited in the window
+        table = _windows(lambda days: trends['borrows'].rolling_sum(days) /
+                         trends['deposits'].rolling_sum(days).where(lambda deposits: deposits > 0) * 100)
+        title = "Utilization (borrows / deposits) in %"
+    # rolling sums are levels, not flows: a bucket shows its last day
+    table, _ = rollups.rollup(table, resolution, stock=True)
+    fig = px.line(table, title=f"Rolling {title}", template='seaborn')
+    fig.update_traces(hovertemplate=None)
+    fig.update_layout(hovermode="x unified")
+    fig.update_layout(title_x=0, margin=dict(l=0, r=10, b=30, t=30), yaxis_title=None, xaxis_title=None)
+    return fig
+
+
+def supply_figure(supply: aggregates.SupplyAggregates, chart_id: str, resolution: str = 'auto'):
+    """Builds one of the ``SUPPLY_CHARTS`` of the Supply/TVL page."""
+    if chart_id == 'tvl_distribution':
+        return _tvl_pie(supply.latest_tvls, 'TVL Distribution')
+    if chart_id == 'month_ago_tvl_distribution':
+        return _tvl_pie(supply.month_ago_tvls, 'One Month ago TVL Distribution')
+
+    if chart_id == 'tvl_over_time':
+        tvls, _ = rollups.rollup(supply.pivots['TVL'], resolution, stock=True)
+        fig = px.area(tvls, title="TVL/Supply Locked over time", template='seaborn')
+        fig.update_traces(mode="lines", hovertemplate=None)
+        fig.update_layout(hovermode="x unified")
+        fig.update_layout(title_x=0, margin=dict(l=0, r=10, b=30, t=30), yaxis_title=None, xaxis_title=None)
+        return fig
+
+    if chart_id in TREND_CHARTS:
+        return _trend_figure(supply, chart_id, resolution)
+
+    metric, title = FLOW_CHARTS[chart_id]
+    flows, bucket = rollups.rollup(supply.pivots[metric], resolution)
+    fig = px.bar(flows, title=f"{rollups.RESOLUTION_TITLES[bucket]} {title}", template='seaborn')
+    fig.update_traces(hovertemplate=None)
+    # deposits and withdraws share a row, so their hover lists every asset of the day
+    fig.update_layout(hovermode="x unified" if chart_id in ('deposits', 'withdraws') else "x")
+    fig.update_layout(title_x=0, margin=dict(l=0, r=10, b=30, t=30), yaxis_title=None, xaxis_title=None)
+    return fig
+
+
+def _build_supply_figure(supply: aggregates.SupplyAggregates, chart_id: str, resolution: str):
+    with metrics.timed('figure', chart=chart_id):
+        return supply_figure(supply, chart_id, resolution)
+
+
+def shared_supply_figure(supply: aggregates.SupplyAggregates, data_key: tuple, chart_id: str, resolution: str = 'auto'):
+    """
+    ``supply_figure`` built once per (data_key, chart_id, resolution) and shared by every session.
+
+    ``data_key`` identifies the data ``supply`` was computed from, e.g. (chain label, store version):
+    a store update changes it, so stale figures are never served and simply age out of the cache.
+    """
+    return figure_cache.get(('supply_figure', data_key, chart_id, resolution),
+                            lambda: _build_supply_figure(supply, chart_id, resolution), FIGURE_TTL, 'supply_figure')
@@ -0,0 +1,46 @@
+import pandas as pd
+
+import metrics
+import snapshot_store
+
+SNAPSHOT_COLUMNS = ["Day", "TVL", 'dailyDepositUSD', 'dailyWithdrawUSD', "Asset", "dailyBorrowUSD", "dailyLiquidateUSD",
+                    "dailyRepayUSD"]
+STAKING_COLUMNS = ["Day", "TOTAL_STAKED_USD", 'TOTAL_STAKED_AAVE', 'STAKED_CUMU', 'AAVE_STAKED_CUMU', "COLOR"]
+
+
+def _usd(column: pd.Series):
+    # same truncation as int(float(value)), done for the whole column at once
+    return pd.to_numeric(column).fillna(0).astype('int64')
+
+
+def snapshot_frame(snapshots: pd.DataFrame):
+    """Typed supply frame from stored ``marketDailySnapshots`` columns: datetime64 days, int64 USD, categorical assets."""
+    frame = pd.DataFrame({
+        'Day': pd.to_datetime(snapshots['timestamp'], unit='s').dt.normalize(),
+        'TVL': _usd(snapshots['totalValueLockedUSD']),
+        'Asset': snapshots['market_name'].astype('category'),
+    })
+    for column in ('dailyDepositUSD', 'dailyWithdrawUSD', 'dailyBorrowUSD', 'dailyLiquidateUSD', 'dailyRepayUSD'):
+        frame[column] = _usd(snapshots[column])
+    metrics.inc('rows_parsed_total', len(frame), kind='snapshots')
+    return frame[SNAPSHOT_COLUMNS]
+
+
+def staking_frame(records):
+    """Typed staking frame from the Flipside query result rows, either raw records or as stored."""
+    raw = pd.DataFrame(records, columns=['DATE', 'TOTAL_STAKED_USD', 'TOTAL_STAKED_AAVE', 'STAKED_CUMU',
+                                         'AAVE_STAKED_CUMU', 'COLOR'])
+    frame = pd.DataFrame({'Day': pd.to_datetime(raw['DATE'], format='%Y-%m-%d'),
+                          'COLOR': raw['COLOR'].astype('category')})
+    for column in ('TOTAL_STAKED_USD', 'TOTAL_STAKED_AAVE', 'STAKED_CUMU', 'AAVE_STAKED_CUMU'):
+        frame[column] = _usd(raw[column])
+    metrics.inc('rows_parsed_total', len(frame), kind='staking')
+    return frame[STAKING_COLUMNS]
+
+
+def stored_snapshot_frame(url: str, version: int):
+    return snapshot_store.load_frame(url, 'snapshots', version, lambda: snapshot_frame(snapshot_store.load(url)))
+
+
+def stored_staking_frame(url: str, version: int):
+    return snapshot_store.load_frame(url, 'staking', version, lambda: staking_frame(snapshot_store.load_staking(url)))
@@ -0,0 +1,125 @@
+"""
+In-process counters and latency histograms for the fetch and render hot paths.
+
+Recording is a dict update under a lock, cheap enough to leave on. Set ``AAVE_DASHBOARD_METRICS_PORT``
+to expose them in the Prometheus text format on ``/metrics``, and ``AAVE_DASHBOARD_DEBUG=1`` to show
+them in a sidebar panel on every page.
+"""
+import bisect
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = 'aave_dashboard_'
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_lock = threading.Lock()
+_counters = defaultdict(float)
+_histograms = {}
+_server_started = False
+
+
+def _key(name: str, labels: dict):
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name: str, value: float = 1, **labels):
+    with _lock:
+        _counters[_key(name, labels)] += value
+
+
+def observe(name: str, seconds: float, **labels):
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            # one count per bucket plus +Inf, then the sum of observations
+            histogram = _histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+        histogram[bisect.bisect_left(BUCKETS, seconds)] += 1
+        histogram[-1] += seconds
+
+
+@contextmanager
+def timed(stage: str, **labels):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe('stage_seconds', time.perf_counter() - started, stage=stage, **labels)
+
+
+def _labels(labels: tuple, **extra):
+    labels = labels + tuple(extra.items())
+    return '{%s}' % ','.join('%s="%s"' % (k, str(v).replace('"', '\\"')) for k, v in labels) if labels else ''
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((key, list(value)) for key, value in _histograms.items())
+    for (name, labels), value in counters:
+        lines.append('%s%s%s %s' % (PREFIX, name, _labels(labels), value))
+    for (name, labels), histogram in histograms:
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ('+Inf',), histogram):
+            cumulative += count
+            lines.append('%s%s_bucket%s %d' % (PREFIX, name, _labels(labels, le=bound), cumulative))
+        lines.append('%s%s_sum%s %s' % (PREFIX, name, _labels(labels), histogram[-1]))
+        lines.append('%s%s_count%s %d' % (PREFIX, name, _labels(labels), cumulative))
+    return '\n'.join(lines) + '\n'
+
+
+def summary():
+    """Rows of (metric, labels, count, total) for the debug panel: counters and histogram count/sum."""
+    with _lock:
+        rows = [(name, dict(labels), value, None) for (name, labels), value in _counters.items()]
+        rows += [(name, dict(labels), sum(histogram[:-1]), round(histogram[-1], 4))
+                 for (name, labels), histogram in _histograms.items()]
+    return sorted(rows, key=lambda row: (row[0], sorted(row[1].items())))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve_from_env():
+    """Starts the /metrics endpoint once per process if ``AAVE_DASHBOARD_METRICS_PORT`` is set."""
+    global _server_started
+    port = os.environ.get('AAVE_DASHBOARD_METRICS_PORT')
+    with _lock:
+        if _server_started or not port:
+            return
+        _server_started = True
+    server = ThreadingHTTPServer(('0.0.0.0', int(port)), _Handler)
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+
+
+def show_debug_panel():
+    """Sidebar table of every metric when ``AAVE_DASHBOARD_DEBUG`` is set."""
+    if not os.environ.get('AAVE_DASHBOARD_DEBUG'):
+        return
+    import pandas as pd
+    import streamlit as st
+
+    with st.sidebar.expander('Metrics'):
+        st.dataframe(pd.DataFrame(
+            [(name, ', '.join('%s=%s' % item for item in sorted(labels.items())), count, total)
+             for name, labels, count, total in summary()],
+            columns=['metric', 'labels', 'count', 'seconds']))
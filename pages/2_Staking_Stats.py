@@ -1,67 +1,65 @@
-from datetime import datetime, timedelta
-
 import pandas as pd
 import plotly.express as px
-import requests
 import streamlit as st
 
+import aggregates
+import analytics
+import chains
+import frames
+import metrics
+import refresher
+import shared_cache
+import snapshot_store
+
 st.set_page_config(page_title='Aave Dashboard', layout='wide', page_icon=':dollar:')
 st.title("Aave Staking(stkAAVE) Dashboard")
 st.sidebar.title('Aave Staking')
 st.sidebar.markdown("this page Contains the Aave Staking information 🎈")
 
+refresher.start()
+metrics.serve_from_env()
+metrics.show_debug_panel()
 
-@st.cache(ttl=6 * 60 * 60)  # 6 hours
-def fetch_data(url: str):
-    res = requests.get(url=url).json()
-    for item in res:
-        item['Day'] = datetime.strptime(item['DATE'], '%Y-%m-%d').date()
-        item['COLOR'] = item['COLOR']
-        item['TOTAL_STAKED_USD'] = int(float(item['TOTAL_STAKED_USD']))
-        item['TOTAL_STAKED_AAVE'] = int(float(item['TOTAL_STAKED_AAVE']))
-        item['STAKED_CUMU'] = int(float(item['STAKED_CUMU']))
-        item['AAVE_STAKED_CUMU'] = int(float(item['AAVE_STAKED_CUMU']))
 
-    return pd.DataFrame(
-        res,
-        columns=["Day", "TOTAL_STAKED_USD", 'TOTAL_STAKED_AAVE', 'STAKED_CUMU', 'AAVE_STAKED_CUMU', "COLOR"])
+@shared_cache.cached(ttl=24 * 60 * 60)
+def load_data(url: str, version: int):
+    with metrics.timed('load', source=chains.source_name(url)):
+        return frames.stored_staking_frame(url, version)
+
 
+@shared_cache.cached(ttl=24 * 60 * 60)
+def load_trends(url: str, version: int):
+    return aggregates.staking_trends(load_data(url, version))
 
-def get_change(current, previous):
-    if current == previous:
-        return 0
-    try:
-        return (abs(current - previous) / previous) * 100.0
-    except ZeroDivisionError:
-        return float('inf')
+
+def fetch_data(url: str):
+    """The staking frame and its trend series."""
+    # the refresher keeps the store up to date, the query is fetched here only if it was never stored
+    if not snapshot_store.version(url):
+        refresher.refresh_staking(url)
+    version = snapshot_store.version(url)
+    return load_data(url, version), load_trends(url, version)
 
 
 def get_delta_color(from_num, to_num):
     return 'inverse' if from_num > to_num else 'normal'
 
 
-chart_data = fetch_data(
-    'https://node-api.flipsidecrypto.com/api/v2/queries/60316905-bca9-4ebc-8459-ac7a20e8eb5c/data/latest')
+chart_data, trends = fetch_data(chains.STAKING_URL)
 
-today_stakes_usd = chart_data.sort_values("Day", ascending=False).head(1)
-one_month_ago_stakes = chart_data.loc[chart_data['Day'] == datetime.now().date() - timedelta(days=30)]
-one_month_ago_staked_usd = one_month_ago_stakes['STAKED_CUMU'].sum()
-today_staked_usd = today_stakes_usd['STAKED_CUMU'].sum()
-
-today_stakes_aave = chart_data.sort_values("Day", ascending=False).head(1)
-one_month_ago_stakes_aave = chart_data.loc[chart_data['Day'] == datetime.now().date() - timedelta(days=30)]
-one_month_ago_staked_aave = one_month_ago_stakes_aave['AAVE_STAKED_CUMU'].sum()
-today_staked_aave = today_stakes_aave['AAVE_STAKED_CUMU'].sum()
+# the month-ago values are the nearest days on or before 30 days before the latest one
+today_staked_usd, one_month_ago_staked_usd = int(trends['staked_usd'].latest), int(trends['staked_usd'].ago(30))
+today_staked_aave, one_month_ago_staked_aave = int(trends['staked_aave'].latest), int(trends['staked_aave'].ago(30))
 
 # Metrics
 c1, c2, c3, c4 = st.columns(4, gap="small")
 c1.metric("Current Staked in Aave", "{:,}".format(today_staked_aave))
 c2.metric("Aave Staked Changes(1 month)", "{:,}".format(today_staked_aave - one_month_ago_staked_aave),
-          f"{round(get_change(today_staked_aave, one_month_ago_staked_aave), 2)}%",
+          f"{round(aggregates.get_change(today_staked_aave, one_month_ago_staked_aave), 2)}%",
           delta_color=get_delta_color(one_month_ago_staked_aave, today_staked_aave))
 c3.metric("Current Staked in USD", "${:,}".format(today_staked_usd))
 c4.metric("USD Staked Changes(1 month)", "${:,}".format(today_staked_usd - one_month_ago_staked_usd),
-          f"{round(get_change(today_staked_usd, one_month_ago_staked_usd), 2)}%",
+          f"{round(aggregates.get_change(today_staked_usd, one_month_ago_staked_usd), 2)}%",
           delta_color=get_delta_color(one_month_ago_staked_usd, today_staked_usd))
 st.markdown("""---""")
 # end metrics
@@ -87,3 +85,23 @@ fig.update_layout(hovermode="x unified")
 fig.update_layout(title_x=0, margin=dict(l=0, r=10, b=10, t=30), yaxis_title=None, xaxis_title=None)
 
 st.plotly_chart(fig, use_container_width=True)
+
+net_stake = trends['net_stake_usd']
+col1, col2 = st.columns(2)
+
+rolling = pd.DataFrame({'%dd' % days: net_stake.rolling_sum(days) for days in analytics.WINDOWS})
+rolling.columns.name = 'Window'
+fig = px.line(rolling, title="Rolling Net Stake(staked-unstakes) in USD", template='seaborn')
+fig.update_traces(hovertemplate=None)
+fig.update_layout(hovermode="x unified")
+fig.update_layout(title_x=0, margin=dict(l=0, r=10, b=10, t=30), yaxis_title=None, xaxis_title=None)
+col1.plotly_chart(fig, use_container_width=True)
+
+averages = pd.DataFrame({'daily': net_stake.series().fillna(0), '7d average': net_stake.moving_average(7),
+                         '30d average': net_stake.moving_average(30)})
+averages.columns.name = 'Net Stake'
+fig = px.line(averages, title="Daily Net Stake in USD and its Moving Averages", template='seaborn')
+fig.update_traces(hovertemplate=None)
+fig.update_layout(hovermode="x unified")
+fig.update_layout(title_x=0, margin=dict(l=0, r=10, b=10, t=30), yaxis_title=None, xaxis_title=None)
+col2.plotly_chart(fig, use_container_width=True)
@@ -5,38 +5,27 @@
 ######## version = 1.0
 ###########################################################################################################
 ###########################################################################################################
-from datetime import datetime, timedelta
-
-import pandas as pd
-import requests
 import streamlit as st
 
+import chains
+import fetcher
+import metrics
+import queries
+import shared_cache
+
 st.set_page_config(page_title='Aave Dashboard', layout='wide', page_icon=':dollar:')
 st.sidebar.title('Insights')
 st.sidebar.markdown("this page Contains some insights about charts and data 🎈")
 
+metrics.serve_from_env()
+metrics.show_debug_panel()
+
 
-@st.cache(ttl=72 * 60 * 60)  # 6 hours
+@shared_cache.cached(ttl=6 * 60 * 60)  # 6 hours
 def fetch_current_tvl(url: str):
-    first = 100
-    raw_data = []
-    payload = {
-        "query": "query{ marketDailySnapshots(first:%s, orderBy: blockNumber, orderDirection: desc, where:{timestamp_gte: 1659815794}){ blockNumber timestamp totalValueLockedUSD dailyDepositUSD dailyWithdrawUSD market { id name } } } " % (
-            first),
-    }
-    res = requests.post(url=url,
-                        json=payload).json()
-    raw_data.extend(res['data']['marketDailySnapshots'])
-
-    for item in raw_data:
-        item['Day'] = datetime.fromtimestamp(int(item['timestamp'])).date()
-        item['Asset'] = item['market']['name']
-        item['TVL'] = int(float(item['totalValueLockedUSD']))
-    dp = pd.DataFrame(
-        raw_data,
-        columns=["Day", "TVL", 'dailyDepositUSD', 'dailyWithdrawUSD', "Asset"])
-    today_tvls = dp.sort_values("Day", ascending=False).groupby("Asset").head(1)
-    return today_tvls['TVL'].sum()
+    # only the last month of TVL is requested, paginated so chains with many markets are not truncated
+    with metrics.timed('current_tvl', source=chains.source_name(url)):
+        return queries.current_tvl(url)
 
 
 row0_spacer1, row0_1, row0_spacer2, row0_2, row0_spacer3 = st.columns((.1, 2.3, .1, 1.3, .1))
@@ -68,32 +57,18 @@ with row3_1:
 # Metrics
 st.markdown("""---""")
 
-c1, c2, c3, c4 = st.columns(4, gap="small")
-today_tvl = fetch_current_tvl('https://api.thegraph.com/subgraphs/name/messari/aave-v2-avalanche-extended')
-c1.metric("Avalanche v2 USD TVL", "{:,}".format(today_tvl))
-
-today_tvl = fetch_current_tvl('https://api.thegraph.com/subgraphs/name/messari/aave-v2-ethereum-extended')
-c2.metric("Ethereum USD TVL", "{:,}".format(today_tvl))
-
-today_tvl = fetch_current_tvl('https://api.thegraph.com/subgraphs/name/messari/aave-v3-optimism-extended')
-c3.metric("Optimism USD TVL", "{:,}".format(today_tvl))
-
-today_tvl = fetch_current_tvl('https://api.thegraph.com/subgraphs/name/messari/aave-v3-polygon-extended')
-c4.metric("Polygon(v3) USD TVL", "{:,}".format(today_tvl))
-
-c1, c2, c3, c4 = st.columns(4, gap="small")
-
-today_tvl = fetch_current_tvl('https://api.thegraph.com/subgraphs/name/messari/aave-v3-harmony-extended')
-c1.metric("Harmony USD TVL", "{:,}".format(today_tvl))
-
-today_tvl = fetch_current_tvl('https://api.thegraph.com/subgraphs/name/messari/aave-v3-fantom-extended')
-c2.metric("Fantom USD TVL", "{:,}".format(today_tvl))
+tvl_chains = [chain for chain in chains.CHAINS if chain.backfilled]
+# all chains are queried at once, so the grid waits for the slowest chain instead of the sum of all of them
+tvls, failed = fetcher.fetch_all(fetch_current_tvl, [chain.subgraph for chain in tvl_chains])
 
-today_tvl = fetch_current_tvl('https://api.thegraph.com/subgraphs/name/messari/aave-v3-arbitrum-extended')
-c3.metric("Arbitrum USD TVL", "{:,}".format(today_tvl))
+for row_start in range(0, len(tvl_chains), 4):
+    columns = st.columns(4, gap="small")
+    for column, chain in zip(columns, tvl_chains[row_start:row_start + 4]):
+        column.metric(f"{chain.label} USD TVL", "{:,}".format(tvls[chain.subgraph]) if chain.subgraph in tvls else "n/a")
 
-today_tvl = fetch_current_tvl('https://api.thegraph.com/subgraphs/name/messari/aave-v3-avalanche-extended')
-c4.metric("Avalanche v3 USD TVL", "{:,}".format(today_tvl))
+if failed:
+    st.warning('Could not load the current TVL of: ' + ', '.join(chain.label for chain in tvl_chains
+                                                                  if chain.subgraph in failed))
 
 st.markdown("""---""")
 
@@ -0,0 +1,64 @@
+"""
+Builds the smallest ``marketDailySnapshots`` query each view needs: only the metric fields it shows,
+and only the time window it covers. Charts ask for the full history of every metric, the metric
+cards for a few days of TVL.
+"""
+import time
+
+import pandas as pd
+
+import fetcher
+import metrics
+
+# frame column -> subgraph field
+SNAPSHOT_FIELDS = {
+    'TVL': 'totalValueLockedUSD',
+    'dailyDepositUSD': 'dailyDepositUSD',
+    'dailyWithdrawUSD': 'dailyWithdrawUSD',
+    'dailyBorrowUSD': 'dailyBorrowUSD',
+    'dailyLiquidateUSD': 'dailyLiquidateUSD',
+    'dailyRepayUSD': 'dailyRepayUSD',
+}
+CURRENT_TVL_DAYS = 31
+
+
+def snapshot_fields(columns=tuple(SNAPSHOT_FIELDS), market=('id', 'name')):
+    """Selection set for ``columns`` (frame column names) plus what pagination and grouping need."""
+    fields = ('id', 'blockNumber', 'timestamp') + tuple(SNAPSHOT_FIELDS[column] for column in columns)
+    return '%s market { %s }' % (' '.join(fields), ' '.join(market))
+
+
+def snapshot_where(days: int = None, block_gte: int = None):
+    where = {}
+    if days is not None:
+        where['timestamp_gte'] = int(time.time()) - days * 24 * 60 * 60
+    if block_gte is not None:
+        where['blockNumber_gte'] = block_gte
+    return where
+
+
+def snapshot_pages(url: str, columns=tuple(SNAPSHOT_FIELDS), days: int = None, block_gte: int = None,
+                   market=('id', 'name')):
+    """Pages of snapshots with only ``columns``, from the last ``days`` and/or from ``block_gte`` on."""
+    return fetcher.paginate(url, 'marketDailySnapshots', snapshot_fields(columns, market),
+                            where=snapshot_where(days, block_gte))
+
+
+def latest_block(url: str):
+    """blockNumber of the most recently indexed snapshot, 0 when the subgraph has none."""
+    query = "query{ marketDailySnapshots(first: 1, orderBy: blockNumber, orderDirection: desc){ blockNumber } }"
+    snapshots = fetcher.post_graphql(url, query)['marketDailySnapshots']
+    return int(snapshots[0]['blockNumber']) if snapshots else 0
+
+
+def current_tvl(url: str, days: int = CURRENT_TVL_DAYS):
+    """Sum of the latest TVL of every market that has a snapshot in the last ``days``."""
+    rows = [row for page in snapshot_pages(url, ['TVL'], days=days, market=('id',)) for row in page]
+    metrics.inc('rows_parsed_total', len(rows), kind='current_tvl')
+    if not rows:
+        return 0
+    snapshots = pd.DataFrame({'market': [row['market']['id'] for row in rows],
+                              'timestamp': pd.to_numeric(pd.Series([row['timestamp'] for row in rows])),
+                              'TVL': pd.to_numeric(pd.Series([row['totalValueLockedUSD'] for row in rows]))})
+    latest = snapshots.sort_values('timestamp').groupby('market').tail(1)
+    return int(latest['TVL'].astype('int64').sum())
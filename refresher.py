@@ -0,0 +1,128 @@
+"""
+Keeps the local snapshot store up to date so pages only ever read from it.
+
+Runs inside the Streamlit process as a daemon thread (see ``start``), or standalone with::
+
+    python refresher.py [--once] [--interval SECONDS]
+
+in which case set ``AAVE_DASHBOARD_EXTERNAL_REFRESHER=1`` for the app so it does not start its own.
+"""
+import argparse
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict, namedtuple
+
+import chains
+import fetcher
+import frames
+import metrics
+import queries
+import snapshot_store
+
+logger = logging.getLogger(__name__)
+
+MAX_BACKOFF = 60 * 60
+
+_locks = defaultdict(threading.Lock)
+_locks_lock = threading.Lock()
+_started = False
+
+
+def _single_flight(url: str, refresh):
+    with _locks_lock:
+        lock = _locks[url]
+    if not lock.acquire(blocking=False):
+        # someone else is already refreshing this source, wait for them instead of fetching it twice
+        with lock:
+            return
+    try:
+        with metrics.timed('refresh', source=chains.source_name(url)):
+            refresh(url)
+    finally:
+        lock.release()
+
+
+def _refresh_subgraph(url: str):
+    # Pages come in id order, one market after the other, so the newest stored block says nothing about
+    # the other markets until a pass has fetched every page: resume where the last complete pass started.
+    # A row that changes while the pass runs gets a block after ``indexed`` and is fetched again next time;
+    # re-fetched rows are deduplicated by id in the store.
+    indexed = queries.latest_block(url)
+    for page in queries.snapshot_pages(url, block_gte=snapshot_store.complete_block(url)):
+        snapshot_store.append(url, page)
+    snapshot_store.publish(url, indexed)
+    # write the typed frame now, so pages (and freshly started processes) only memory-map it
+    frames.stored_snapshot_frame(url, snapshot_store.version(url))
+
+
+def _refresh_staking(url: str):
+    snapshot_store.save_staking(url, fetcher.get_json(url))
+    frames.stored_staking_frame(url, snapshot_store.version(url))
+
+
+def refresh_subgraph(url: str):
+    _single_flight(url, _refresh_subgraph)
+
+
+def refresh_staking(url: str):
+    _single_flight(url, _refresh_staking)
+
+
+Target = namedtuple('Target', ['url', 'refresh', 'interval'])
+
+
+def targets(interval: float = None):
+    """Every configured chain plus the staking query, each on its own cadence unless ``interval`` overrides it."""
+    return [Target(chain.subgraph, refresh_subgraph, interval or chain.refresh_interval) for chain in chains.CHAINS] + \
+           [Target(chains.STAKING_URL, refresh_staking, interval or chains.STAKING_REFRESH_INTERVAL)]
+
+
+def _jitter(seconds: float):
+    # spreads the refreshes of many sources (and processes) instead of firing them in lockstep
+    return seconds * random.uniform(0.8, 1.2)
+
+
+def run(refresh_targets: list, once: bool = False, stop: threading.Event = None):
+    """Refreshes every due target concurrently, forever unless ``once``; failures back off exponentially."""
+    stop = stop or threading.Event()
+    next_due = {target: 0 for target in refresh_targets}
+    failures = defaultdict(int)
+    while not stop.is_set():
+        now = time.monotonic()
+        due = [target for target in refresh_targets if next_due[target] <= now]
+        _, errors = fetcher.fetch_all(lambda target: target.refresh(target.url), due)
+        for target in due:
+            if target in errors:
+                failures[target] += 1
+                backoff = min(MAX_BACKOFF, 30 * 2 ** failures[target])
+                logger.warning('refreshing %s failed (%s), retrying in ~%ds', target.url, errors[target], backoff)
+                next_due[target] = now + _jitter(backoff)
+            else:
+                failures[target] = 0
+                next_due[target] = now + _jitter(target.interval)
+        if once:
+            return errors
+        stop.wait(max(1, min(next_due.values()) - time.monotonic()))
+
+
+def start():
+    """Starts the in-process refresher once per process, unless an external one is configured."""
+    global _started
+    with _locks_lock:
+        if _started or os.environ.get('AAVE_DASHBOARD_EXTERNAL_REFRESHER'):
+            return
+        _started = True
+    threading.Thread(target=run, args=(targets(),), name='snapshot-refresher', daemon=True).start()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Refresh the local Aave snapshot store.')
+    parser.add_argument('--once', action='store_true', help='refresh every source once and exit')
+    parser.add_argument('--interval', type=float, help='seconds between refreshes, overriding every chain cadence')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    errors = run(targets(args.interval), once=args.once)
+    raise SystemExit(1 if errors else 0)
@@ -0,0 +1,34 @@
+import pandas as pd
+
+RESOLUTIONS = ('auto', 'day', 'week', 'month')
+RESOLUTION_TITLES = {'day': 'Daily', 'week': 'Weekly', 'month': 'Monthly'}
+POINT_BUDGET = 4000  # plotted points per chart in auto mode
+
+_BUCKETS = {'week': dict(rule='W-MON', label='left', closed='left'), 'month': dict(rule='MS')}
+_BUCKET_DAYS = {'day': 1, 'week': 7, 'month': 30}
+
+
+def pick_resolution(pivot: pd.DataFrame, budget: int = POINT_BUDGET):
+    """Finest resolution whose chart of ``pivot`` (Day x series) stays under ``budget`` points."""
+    if pivot.empty:
+        return 'day'
+    days = (pivot.index.max() - pivot.index.min()).days + 1
+    for resolution in ('day', 'week'):
+        if days // _BUCKET_DAYS[resolution] * pivot.shape[1] <= budget:
+            return resolution
+    return 'month'
+
+
+def rollup(pivot: pd.DataFrame, resolution: str, stock: bool = False, budget: int = POINT_BUDGET):
+    """
+    Buckets a Day-indexed table to ``resolution``, returning it with the resolution actually used.
+
+    Flows (daily deposits, borrows...) are summed per bucket; stocks such as TVL keep the last
+    value of the bucket.
+    """
+    if resolution == 'auto':
+        resolution = pick_resolution(pivot, budget)
+    if resolution == 'day' or pivot.empty:
+        return pivot, resolution
+    buckets = pivot.resample(**_BUCKETS[resolution])
+    return (buckets.last() if stock else buckets.sum()), resolution
@@ -0,0 +1,145 @@
+import functools
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pandas as pd
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+MAX_ENTRIES = 128
+MAX_BYTES = 1024 * 1024 * 1024
+
+# Cached frames are handed to every session as the same object instead of a deep copy per hit;
+# copy-on-write (always on since pandas 3) keeps one session's edits from leaking into the others.
+if int(pd.__version__.split('.')[0]) < 3:
+    try:
+        pd.set_option('mode.copy_on_write', True)
+    except KeyError:
+        pass
+
+_Entry = namedtuple('_Entry', ['value', 'expires_at', 'size'])
+_refresher = ThreadPoolExecutor(max_workers=4, thread_name_prefix='cache-refresh')
+
+
+def sizeof(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class BoundedCache:
+    """
+    Process-wide LRU cache bounded by entry count and approximate size in bytes.
+
+    Expired entries are served stale while a single background refresh replaces them, and
+    concurrent misses on the same key wait for one computation instead of each running it.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._inflight = {}  # key -> Future of the computation a miss is waiting for
+        self._refreshing = {}  # key -> background refresh of a stale entry, never waited on
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, compute, ttl: float, name: str = ''):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if entry.expires_at > time.monotonic():
+                    metrics.inc('cache_requests_total', cache=name, result='hit')
+                else:
+                    metrics.inc('cache_requests_total', cache=name, result='stale')
+                    if key not in self._refreshing:
+                        self._refreshing[key] = _refresher.submit(self._refresh, key, compute, ttl)
+                return entry.value
+
+            metrics.inc('cache_requests_total', cache=name, result='miss')
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+
+        if owner:
+            try:
+                value = compute()
+                self.put(key, value, ttl)
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            else:
+                future.set_result(value)
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+        return future.result()
+
+    def _refresh(self, key, compute, ttl: float):
+        try:
+            self.put(key, compute(), ttl)
+        except Exception:
+            # keep serving the stale value, the next hit retries
+            logger.exception('background refresh of %r failed', key)
+        finally:
+            with self._lock:
+                self._refreshing.pop(key, None)
+
+    def put(self, key, value, ttl: float):
+        entry = _Entry(value, time.monotonic() + ttl, sizeof(value))
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._bytes = 0
+            else:
+                old = self._entries.pop(key, None)
+                if old is not None:
+                    self._bytes -= old.size
+
+
+default_cache = BoundedCache()
+
+
+def cached(ttl: float, cache: BoundedCache = default_cache):
+    """
+    Replacement for ``st.cache``: results are shared by every session of the process without copying,
+    and an expired result is returned immediately while it is recomputed in the background.
+    """
+
+    def decorator(func):
+        # page scripts all run as __main__, so the defining file tells same-named functions apart
+        prefix = (func.__code__.co_filename, func.__qualname__)
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            return cache.get(prefix + args, lambda: func(*args), ttl, func.__qualname__)
+
+        wrapper.invalidate = lambda *args: cache.invalidate(prefix + args)
+        return wrapper
+
+    return decorator
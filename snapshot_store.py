@@ -0,0 +1,183 @@
+import os
+import sqlite3
+import tempfile
+import threading
+from collections import defaultdict
+from contextlib import closing
+
+import pandas as pd
+import pyarrow as pa
+
+import chains
+
+DATA_DIR = os.environ.get('AAVE_DASHBOARD_DATA_DIR',
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), '.data'))
+
+USD_FIELDS = ('totalValueLockedUSD', 'dailyDepositUSD', 'dailyWithdrawUSD', 'dailyBorrowUSD', 'dailyLiquidateUSD',
+              'dailyRepayUSD')
+
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS market_daily_snapshots (
+    id TEXT PRIMARY KEY,
+    blockNumber INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    market_id TEXT NOT NULL,
+    market_name TEXT NOT NULL,
+    %s
+)
+""" % ',\n    '.join('%s REAL' % field for field in USD_FIELDS)
+_CREATE_INDEX = "CREATE INDEX IF NOT EXISTS idx_block_number ON market_daily_snapshots (blockNumber)"
+# block every market is complete up to, written only when a refresh pass has fetched all its pages
+_CREATE_STATE_TABLE = "CREATE TABLE IF NOT EXISTS refresh_state (complete_block INTEGER NOT NULL)"
+
+STAKING_FIELDS = ('TOTAL_STAKED_USD', 'TOTAL_STAKED_AAVE', 'STAKED_CUMU', 'AAVE_STAKED_CUMU')
+_CREATE_STAKING_TABLE = """
+CREATE TABLE IF NOT EXISTS staking_daily (
+    DATE TEXT NOT NULL,
+    COLOR TEXT,
+    %s
+)
+""" % ',\n    '.join('%s REAL' % field for field in STAKING_FIELDS)
+
+
+def _partition_path(url: str):
+    # one database per source, e.g. .data/aave-v2-ethereum-extended.sqlite for a subgraph
+    # and .data/flipside-<query id>.sqlite for a Flipside query
+    return os.path.join(DATA_DIR, chains.source_name(url) + '.sqlite')
+
+
+def _connect(url: str, *schema: str):
+    os.makedirs(DATA_DIR, exist_ok=True)
+    conn = sqlite3.connect(_partition_path(url), timeout=30)
+    # readers in the page processes never block the refresher writing new snapshots
+    conn.execute("PRAGMA journal_mode=WAL")
+    for statement in schema:
+        conn.execute(statement)
+    return conn
+
+
+def _bump_version(conn: sqlite3.Connection):
+    conn.execute("PRAGMA user_version = %d" % (conn.execute("PRAGMA user_version").fetchone()[0] + 1))
+
+
+def version(url: str):
+    """Counter bumped every time a complete refresh of the source is published, 0 before the first one."""
+    if not os.path.exists(_partition_path(url)):
+        return 0
+    with closing(sqlite3.connect(_partition_path(url), timeout=30)) as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def complete_block(url: str):
+    """Block the stored history of every market is complete up to, where the next refresh resumes; 0 before any."""
+    with closing(_connect(url, _CREATE_STATE_TABLE)) as conn:
+        row = conn.execute("SELECT complete_block FROM refresh_state").fetchone()
+        return row[0] if row else 0
+
+
+def publish(url: str, block: int):
+    """
+    Ends a refresh pass: records that the history is complete up to ``block`` and bumps the version,
+    so pages only pick up the appended pages once every one of them is stored.
+    """
+    with closing(_connect(url, _CREATE_STATE_TABLE)) as conn, conn:
+        conn.execute("DELETE FROM refresh_state")
+        conn.execute("INSERT INTO refresh_state (complete_block) VALUES (?)", (block,))
+        _bump_version(conn)
+
+
+def append(url: str, snapshots: list):
+    """
+    Upserts raw ``marketDailySnapshots`` rows; a snapshot re-indexed later in its day replaces the old row.
+    The rows are not published (the version does not change) until ``publish`` ends the refresh pass.
+    """
+    if not snapshots:
+        return
+    columns = ('id', 'blockNumber', 'timestamp', 'market_id', 'market_name') + USD_FIELDS
+    rows = [(s['id'], int(s['blockNumber']), int(s['timestamp']), s['market']['id'], s['market']['name'])
+            + tuple(float(s[field]) for field in USD_FIELDS)
+            for s in snapshots]
+    with closing(_connect(url, _CREATE_TABLE, _CREATE_INDEX)) as conn, conn:
+        conn.executemany("INSERT OR REPLACE INTO market_daily_snapshots (%s) VALUES (%s)"
+                         % (', '.join(columns), ', '.join('?' * len(columns))), rows)
+
+
+def load(url: str):
+    """Returns every stored snapshot as one column per field, ordered by blockNumber."""
+    with closing(_connect(url, _CREATE_TABLE, _CREATE_INDEX)) as conn:
+        return pd.read_sql_query("SELECT id, blockNumber, timestamp, market_id, market_name, %s "
+                                 "FROM market_daily_snapshots ORDER BY blockNumber" % ', '.join(USD_FIELDS), conn)
+
+
+def save_staking(url: str, records: list):
+    """Replaces the stored staking history with the latest Flipside query result."""
+    columns = ('DATE', 'COLOR') + STAKING_FIELDS
+    rows = [tuple(record[column] for column in columns) for record in records]
+    with closing(_connect(url, _CREATE_STAKING_TABLE)) as conn, conn:
+        conn.execute("DELETE FROM staking_daily")
+        conn.executemany("INSERT INTO staking_daily (%s) VALUES (%s)"
+                         % (', '.join(columns), ', '.join('?' * len(columns))), rows)
+        _bump_version(conn)
+
+
+def load_staking(url: str):
+    with closing(_connect(url, _CREATE_STAKING_TABLE)) as conn:
+        return pd.read_sql_query("SELECT DATE, COLOR, %s FROM staking_daily ORDER BY DATE, rowid"
+                                 % ', '.join(STAKING_FIELDS), conn)
+
+
+_frame_locks = defaultdict(threading.Lock)
+_frame_locks_lock = threading.Lock()
+
+
+def _frame_path(url: str, kind: str):
+    return os.path.join(DATA_DIR, '%s.%s.arrow' % (chains.source_name(url), kind))
+
+
+def _read_frame(path: str, version: int):
+    if not os.path.exists(path):
+        return None
+    # memory-mapped: columns are read lazily from the OS page cache, which every worker process shares
+    reader = pa.ipc.open_file(pa.memory_map(path))
+    if int((reader.schema.metadata or {}).get(b'version', 0)) != version:
+        return None
+    return reader.read_all().to_pandas(split_blocks=True)
+
+
+def _write_frame(path: str, frame: pd.DataFrame, version: int):
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    table = table.replace_schema_metadata(dict(table.schema.metadata or {}, version=str(version)))
+    # a temporary file of its own, so writers in other processes never write into the same one
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    os.close(fd)
+    try:
+        # uncompressed, so the file can be memory-mapped without decoding; categoricals stay dictionary-encoded
+        with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def load_frame(url: str, kind: str, version: int, build):
+    """
+    The typed ``kind`` frame of a source at ``version``, memory-mapped from its Arrow IPC file.
+
+    When the file is missing or was written for another version, ``build()`` makes the frame from the
+    SQLite partition and it is persisted for the next process that starts.
+    """
+    path = _frame_path(url, kind)
+    frame = _read_frame(path, version)
+    if frame is not None:
+        return frame
+    with _frame_locks_lock:
+        lock = _frame_locks[path]
+    # one thread of the process builds it, the others wait and memory-map what it wrote
+    with lock:
+        frame = _read_frame(path, version)
+        if frame is None:
+            frame = build()
+            os.makedirs(DATA_DIR, exist_ok=True)
+            _write_frame(path, frame, version)
+    return frame
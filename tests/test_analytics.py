@@ -0,0 +1,49 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aggregates  # noqa: E402
+import analytics  # noqa: E402
+import figures  # noqa: E402
+import frames  # noqa: E402
+
+DAYS = pd.date_range('2024-01-01', periods=120, freq='D')
+
+
+def test_empty_series():
+    series = analytics.DailySeries(pd.Series([], index=pd.DatetimeIndex([]), dtype='float64'))
+    assert series.latest == 0 and series.ago(30) == 0 and series.sum(30) == 0
+    assert series.series().empty and series.rolling_sum(30).empty and series.moving_average(7).empty
+
+
+def test_gappy_series():
+    daily = pd.Series(np.arange(120, dtype='float64'), index=DAYS).drop(DAYS[[80, 89, 90, 91]])
+    series = analytics.DailySeries(daily)
+
+    # the last day is 119, 30 days before it (day 89) has no value: the nearest earlier day is 88
+    assert series.ago(30) == 88
+    assert series.at(DAYS[0] - pd.Timedelta(days=5)) == 0
+    assert series.sum(7) == sum(range(113, 120))
+    expected = daily.reindex(DAYS, fill_value=0).rolling(30, min_periods=1).sum()
+    assert np.allclose(series.rolling_sum(30).to_numpy(), expected.to_numpy())
+    assert series.series().isna().sum() == 4
+
+
+def test_trend_figures_of_a_chain_without_snapshots():
+    empty = pd.DataFrame({column: [] for column in ('timestamp', 'market_name', 'totalValueLockedUSD',
+                                                    'dailyDepositUSD', 'dailyWithdrawUSD', 'dailyBorrowUSD',
+                                                    'dailyLiquidateUSD', 'dailyRepayUSD')})
+    supply = aggregates.supply_aggregates(frames.snapshot_frame(empty))
+    for chart_id in figures.TREND_CHARTS:
+        figures.supply_figure(supply, chart_id)
+    assert aggregates.utilization(supply.trends, 30) == 0
+
+
+def test_staking_trends_of_an_empty_query_result():
+    trends = aggregates.staking_trends(frames.staking_frame([]))
+    assert trends['staked_usd'].latest == 0 and trends['staked_usd'].ago(30) == 0
+    assert trends['net_stake_usd'].rolling_sum(30).empty and trends['net_stake_usd'].series().empty
@@ -0,0 +1,90 @@
+"""
+Pagination and refresh against the local fake subgraph (``benchmarks/fake_server.py``).
+
+The 500k-row history takes a while; set ``PAGINATION_MAX_SECONDS`` to tighten or loosen its time budget.
+"""
+import os
+import queue
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fetcher  # noqa: E402
+import queries  # noqa: E402
+import refresher  # noqa: E402
+import snapshot_store  # noqa: E402
+from benchmarks import fake_server  # noqa: E402
+
+LARGE_HISTORY = 500000
+MAX_SECONDS = float(os.environ.get('PAGINATION_MAX_SECONDS', 120))
+
+
+@pytest.fixture(scope='module')
+def base_url():
+    port_queue = queue.Queue()
+    threading.Thread(target=fake_server.serve, args=(port_queue,), daemon=True).start()
+    return 'http://127.0.0.1:%d' % port_queue.get(timeout=10)
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_store, 'DATA_DIR', str(tmp_path))
+    return tmp_path
+
+
+def expected_rows(rows: int):
+    assets, days = fake_server.history_shape(rows)
+    return assets * days
+
+
+def test_paginate_returns_every_row_once(base_url):
+    url = '%s/subgraphs/name/bench/%d' % (base_url, LARGE_HISTORY)
+    started = time.perf_counter()
+    ids = [row['id'] for page in queries.snapshot_pages(url) for row in page]
+    elapsed = time.perf_counter() - started
+
+    assert len(ids) == expected_rows(LARGE_HISTORY)
+    assert len(set(ids)) == len(ids)
+    assert elapsed < MAX_SECONDS, '%d rows took %.1fs' % (len(ids), elapsed)
+
+
+def test_refresh_after_a_failed_pass_keeps_every_row(base_url, data_dir, monkeypatch):
+    rows = 20000
+    url = '%s/subgraphs/name/bench/%d' % (base_url, rows)
+    post_graphql, calls = fetcher.post_graphql, []
+
+    def fail_second_page(*args, **kwargs):
+        # the latest block is asked for first, then the pages
+        calls.append(args)
+        if len(calls) == 3:
+            raise fetcher.SubgraphError('second page failed')
+        return post_graphql(*args, **kwargs)
+
+    monkeypatch.setattr(fetcher, 'post_graphql', fail_second_page)
+    with pytest.raises(fetcher.SubgraphError):
+        refresher.refresh_subgraph(url)
+    assert 0 < len(snapshot_store.load(url)) < expected_rows(rows)
+    assert snapshot_store.complete_block(url) == 0
+    # pages never see the partial history
+    assert snapshot_store.version(url) == 0
+
+    refresher.refresh_subgraph(url)
+    assert len(snapshot_store.load(url)) == expected_rows(rows)
+    assert snapshot_store.version(url) == 1
+
+
+def test_refresh_resumes_from_the_last_complete_pass(base_url, data_dir):
+    rows = 20000
+    url = '%s/subgraphs/name/bench/%d' % (base_url, rows)
+    refresher.refresh_subgraph(url)
+    complete = snapshot_store.complete_block(url)
+    assert complete > 0
+
+    fetched = sum(len(page) for page in queries.snapshot_pages(url, block_gte=complete))
+    refresher.refresh_subgraph(url)
+    assert fetched < expected_rows(rows) // 10
+    assert len(snapshot_store.load(url)) == expected_rows(rows)
@@ -0,0 +1,23 @@
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import shared_cache  # noqa: E402
+
+
+def test_miss_during_a_stale_refresh_of_an_evicted_key_computes_the_value():
+    cache = shared_cache.BoundedCache(max_entries=1)
+    release = threading.Event()
+    cache.get('a', lambda: 1, ttl=0)
+    # served stale while the refresh is blocked in the background
+    assert cache.get('a', lambda: release.wait() and 2, ttl=0) == 1
+    cache.put('b', 9, ttl=60)  # evicts 'a'
+    results = []
+    miss = threading.Thread(target=lambda: results.append(cache.get('a', lambda: 3, ttl=60)), daemon=True)
+    miss.start()
+    # the miss must not wait for the blocked refresh, nor get its (lack of a) result
+    miss.join(timeout=5)
+    release.set()
+    assert results == [3]